@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк запуска сканера: время до первой находки (time-to-first-finding)
+"""
+
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+REPO_DIR = Path(__file__).parent
+SCANNER = REPO_DIR / "shai_hulud_scanner.py"
+DEFAULT_TARGET = REPO_DIR / "test-samples" / "malicious" / "test-package-preinstall-bun"
+
+
+def run_once(scanner: Path, target: Path, extra_args: List[str]) -> Tuple[Optional[float], float]:
+    """Один запуск main(): (время до первой находки, полное время)"""
+    start = time.perf_counter()
+    first_finding = None
+    proc = subprocess.Popen(
+        [sys.executable, '-u', str(scanner), str(target)] + extra_args,
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, encoding='utf-8',
+    )
+    for line in proc.stdout:
+        if first_finding is None and '[CRITICAL]' in line:
+            first_finding = time.perf_counter() - start
+    proc.wait()
+    return first_finding, time.perf_counter() - start
+
+
+def bench(label: str, scanner: Path, target: Path, runs: int, extra_args: List[str]):
+    """Серия запусков, вывод медианы и минимума"""
+    # Прогревочный запуск: кэш ФС и marshal снапшот IOCs (для --ioc-cache)
+    run_once(scanner, target, extra_args)
+
+    ttff, total = [], []
+    for _ in range(runs):
+        first_finding, elapsed = run_once(scanner, target, extra_args)
+        total.append(elapsed)
+        if first_finding is not None:
+            ttff.append(first_finding)
+
+    ttff_text = (f"{statistics.median(ttff) * 1000:7.1f} ms (min {min(ttff) * 1000:.1f})"
+                 if ttff else "    нет находок")
+    print(f"{label:<28} первая находка: {ttff_text}   всего: {statistics.median(total) * 1000:7.1f} ms")
+
+
+def extract_revision(revision: str, workdir: Path) -> Path:
+    """Копия сканера из git ревизии (рядом с CSV, который он ищет в своей папке)"""
+    scanner = workdir / "shai_hulud_scanner.py"
+    source = subprocess.run(
+        ['git', '-C', str(REPO_DIR), 'show', f'{revision}:shai_hulud_scanner.py'],
+        check=True, stdout=subprocess.PIPE,
+    ).stdout
+    scanner.write_bytes(source)
+    shutil.copy(REPO_DIR / "consolidated_iocs.csv", workdir / "consolidated_iocs.csv")
+    return scanner
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Бенчмарк запуска shai_hulud_scanner.py (time-to-first-finding)')
+    parser.add_argument('target', nargs='?', default=str(DEFAULT_TARGET),
+                        help='Проект для сканирования (по умолчанию маленький проект с CRITICAL находкой)')
+    parser.add_argument('--runs', type=int, default=20, help='Количество запусков (по умолчанию 20)')
+    parser.add_argument('--baseline', metavar='REV',
+                        help='Git ревизия для сравнения, например main или HEAD~1')
+    args = parser.parse_args()
+
+    target = Path(args.target)
+    print(f"🎯 {target} ({args.runs} запусков, python {sys.version.split()[0]})\n")
+
+    if args.baseline:
+        with tempfile.TemporaryDirectory() as tmp:
+            bench(f"{args.baseline}", extract_revision(args.baseline, Path(tmp)), target, args.runs, [])
+
+    bench("текущий", SCANNER, target, args.runs, [])
+    bench("текущий (--ioc-cache)", SCANNER, target, args.runs, ['--ioc-cache'])
+    bench("текущий (--quick)", SCANNER, target, args.runs, ['--quick'])
+
+
+if __name__ == "__main__":
+    main()
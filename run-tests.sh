@@ -49,6 +49,190 @@ echo ""
 python3 shai_hulud_scanner.py test-samples/clean-test/package.json
 echo ""
 
+# Test 2a: Python Scanner on workflows (nested .github/workflows, composite actions, evasive YAML)
+echo "=================================="
+echo "Test 2a: Python Scanner - Workflows"
+echo "=================================="
+echo ""
+
+python3 shai_hulud_scanner.py test-samples/workflow-project/ > /tmp/shai-hulud-workflows.txt || true
+
+expect_finding() {
+    if grep -A2 "\] $1\$" /tmp/shai-hulud-workflows.txt | grep -q "file: $2\$"; then
+        echo -e "${GREEN}✅ $1: $2${NC}"
+    else
+        echo -e "${RED}❌ Не обнаружено $1 в $2${NC}"
+        exit 1
+    fi
+}
+
+expect_finding workflow_pattern_discussion_injection .github/workflows/discussion-block-comment.yml
+expect_finding workflow_pattern_discussion_injection .github/workflows/discussion-plain-multiline.yml
+expect_finding workflow_pattern_discussion_injection .github/workflows/discussion-flow-mapping.yml
+expect_finding workflow_pattern_discussion_injection .github/workflows/discussion-github-script.yml
+expect_finding workflow_pattern_discussion_injection .github/workflows/discussion-job-env.yml
+expect_finding workflow_pattern_self_hosted_runner .github/workflows/discussion-flow-mapping.yml
+expect_finding workflow_pattern_secrets_artifact packages/app/.github/workflows/release.yml
+expect_finding workflow_pattern_secrets_artifact actions/setup/action.yml
+expect_finding workflow_pattern_formatter_workflow actions/setup/action.yml
+echo ""
+
+# Test 2b: Python Scanner on clean workflows and composite actions
+echo "=================================="
+echo "Test 2b: Python Scanner - Clean Workflows"
+echo "=================================="
+echo ""
+
+python3 shai_hulud_scanner.py test-samples/clean-workflow-project/
+echo ""
+
+# Test 2c: Watch mode - polling watcher picks up a new malicious file
+echo "=================================="
+echo "Test 2c: Python Scanner - Watch (polling)"
+echo "=================================="
+echo ""
+
+python3 - <<'PY'
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+from shai_hulud_scanner import PollingWatcher, ScannerEngine
+
+engine = ScannerEngine(verbose=False)
+root = Path(tempfile.mkdtemp())
+try:
+    (root / 'src').mkdir()
+    (root / '.cache').mkdir()
+    watcher = PollingWatcher(root, interval=0.1)
+    (root / 'src' / 'setup_bun.js').write_text('// dropper\n')
+    (root / '.cache' / 'bundle.js').write_text('// SHA1HULUD\n')
+
+    found = {}
+    for path in watcher.wait(1) or ():
+        for finding in engine.scan_tree_file(path, root).findings:
+            found.setdefault(finding['file'], set()).add(finding['type'])
+finally:
+    shutil.rmtree(root)
+
+checks = [
+    ('новый src/setup_bun.js обнаружен', 'known_malicious_file' in found.get('src/setup_bun.js', ())),
+    ('JS в скрытом каталоге не сканируется (как при полном обходе)', '.cache/bundle.js' not in found),
+]
+for label, ok in checks:
+    print(f"\033[0;32m✅ {label}\033[0m" if ok else f"\033[0;31m❌ {label}\033[0m")
+sys.exit(0 if all(ok for _, ok in checks) else 1)
+PY
+echo ""
+
+# Test 2d: Library API (ScannerEngine)
+echo "=================================="
+echo "Test 2d: Python Scanner - ScannerEngine API"
+echo "=================================="
+echo ""
+
+python3 - <<'PY'
+import sys
+from pathlib import Path
+
+from shai_hulud_scanner import ScannerEngine
+
+engine = ScannerEngine(verbose=False)
+# Сэмплы lock файлов ссылаются на zapier-platform-core@0.15.0 (fallback список IOCs)
+lock_engine = ScannerEngine(compromised_packages={'zapier-platform-core': ['0.15.0']})
+locks = Path('test-samples/malicious/test-lock-files')
+
+
+def raises(error, call):
+    try:
+        call()
+    except error:
+        return True
+    return False
+
+
+checks = []
+for kind, file_name in [('npm', 'package-lock.json'), ('yarn', 'yarn.lock'), ('pnpm', 'pnpm-lock.yaml')]:
+    with open(locks / file_name, 'rb') as f:
+        result = lock_engine.scan_lockfile(kind, f)
+    checks.append((f'scan_lockfile({kind!r}): скомпрометированный zapier-platform-core',
+                   not result.is_clean and result.packages.get('zapier-platform-core') == '0.15.0'))
+
+malicious = Path('test-samples/malicious/test-package-preinstall-bun/package.json').read_bytes()
+result = engine.scan_bytes('package.json', malicious)
+checks.append(('scan_bytes(package.json): CRITICAL находка', not result.is_clean))
+clean = Path('test-samples/clean-test/package.json').read_bytes()
+result = engine.scan_bytes('package.json', clean)
+checks.append(('scan_bytes(чистый package.json): без CRITICAL', result.is_clean and result.scanned_files == ['package.json']))
+result = engine.scan_bytes('src/index.js', b'// SHA1HULUD', deep_scan=False)
+checks.append(('scan_bytes(deep_scan=False): пропуск JS отмечен в errors', result.errors and not result.scanned_files))
+checks.append(('scan_bytes(README.md): ValueError', raises(ValueError, lambda: engine.scan_bytes('README.md', b''))))
+checks.append(('scan_path(README.md): ValueError', raises(ValueError, lambda: engine.scan_path('README.md'))))
+checks.append(('scan_path(несуществующий путь): FileNotFoundError',
+               raises(FileNotFoundError, lambda: engine.scan_path('test-samples/missing'))))
+
+for label, ok in checks:
+    print(f"\033[0;32m✅ {label}\033[0m" if ok else f"\033[0;31m❌ {label}\033[0m")
+sys.exit(0 if all(ok for _, ok in checks) else 1)
+PY
+echo ""
+
+# Test 2e: --fail-fast / --time-budget (exit code 2 - partial result without CRITICAL)
+echo "=================================="
+echo "Test 2e: Python Scanner - Fail-fast and Time Budget"
+echo "=================================="
+echo ""
+
+expect_exit() {
+    local expected=$1 label=$2
+    shift 2
+    set +e
+    "$@" > /tmp/shai-hulud-exit.txt 2>&1
+    local code=$?
+    set -e
+    if [ "$code" -eq "$expected" ]; then
+        echo -e "${GREEN}✅ $label (exit $code)${NC}"
+    else
+        echo -e "${RED}❌ $label: exit $code, ожидался $expected${NC}"
+        exit 1
+    fi
+}
+
+expect_output() {
+    if grep -q "$1" /tmp/shai-hulud-exit.txt; then
+        echo -e "${GREEN}✅ вывод содержит: $1${NC}"
+    else
+        echo -e "${RED}❌ вывод не содержит: $1${NC}"
+        exit 1
+    fi
+}
+
+expect_exit 2 "Лимит времени исчерпан, CRITICAL нет" \
+    python3 shai_hulud_scanner.py test-samples/clean-workflow-project/ --time-budget 0
+expect_output "ЧАСТИЧНЫЙ РЕЗУЛЬТАТ"
+
+expect_exit 2 "Рекурсивно с лимитом 0: проекты не засчитаны как чистые" \
+    python3 shai_hulud_scanner.py test-samples/ --recursive --time-budget 0
+expect_output "Проверено проектов: 0"
+expect_output "Чистых проектов: 0"
+
+expect_exit 1 "--fail-fast останавливается на первой CRITICAL находке" \
+    python3 shai_hulud_scanner.py test-samples/workflow-project/ --fail-fast --json-report /tmp/shai-hulud-fail-fast.json
+python3 - <<'PY'
+import json
+import sys
+
+report = json.load(open('/tmp/shai-hulud-fail-fast.json', encoding='utf-8'))
+ok = (report['scan_info']['stop_reason'] == 'fail_fast'
+      and len({f['file'] for f in report['findings'] if f['severity'] == 'CRITICAL'}) == 1)
+print(f"\033[0;32m✅ отчёт: stop_reason=fail_fast, CRITICAL из одного файла\033[0m" if ok
+      else f"\033[0;31m❌ отчёт: {report['scan_info']['stop_reason']}, {report['summary']}\033[0m")
+sys.exit(0 if ok else 1)
+PY
+
+echo ""
+
 # Test 3: Semgrep on malicious samples
 if command -v semgrep &> /dev/null; then
     echo "=================================="
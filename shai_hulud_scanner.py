@@ -7,16 +7,19 @@ import json
 import sys
 import os
 import re
-import csv
-import urllib.request
+import time
 from typing import Dict, List, Set, Tuple, Optional
-from pathlib import Path
-from datetime import datetime
+from pathlib import Path, PurePosixPath
+from types import MappingProxyType
 
 # URL списка IOCs от Datadog
 DATADOG_IOCS_URL = "https://raw.githubusercontent.com/DataDog/indicators-of-compromise/main/shai-hulud-2.0/consolidated_iocs.csv"
 LOCAL_IOCS_FILE = Path(__file__).parent / "consolidated_iocs.csv"
 
+# Опциональный кэш разобранного CSV (marshal, --ioc-cache): пересоздаётся при изменении mtime/размера CSV
+LOCAL_IOCS_SNAPSHOT = Path(__file__).parent / ".consolidated_iocs.marshal"
+IOCS_SNAPSHOT_VERSION = 1
+
 # Базовый список (если не удается загрузить из GitHub)
 FALLBACK_COMPROMISED_PACKAGES = {
     "zapier-platform-core": ["0.15.0", "0.15.1"],
@@ -71,31 +74,111 @@ JS_MALICIOUS_PATTERNS = {
     'datadog_credentials': r'process\.env\.(?:DD_API_KEY|DATADOG_API_KEY|DD_APP_KEY)',
 }
 
-# Паттерны для GitHub Actions workflows
+# Severity JS паттернов (по умолчанию WARNING)
+JS_PATTERN_SEVERITY = {
+    'credential_theft_git': 'CRITICAL',
+    'credential_theft_npm': 'CRITICAL',
+    'credential_theft_aws': 'CRITICAL',
+    'trufflehog_usage': 'CRITICAL',
+    'ioc_files': 'CRITICAL',
+    'home_destruction': 'CRITICAL',
+    'runner_registration': 'CRITICAL',
+    'github_exfiltration': 'HIGH',
+    'metadata_service': 'HIGH',
+    'bun_install': 'HIGH',
+}
+
+# Правила для GitHub Actions workflows: (поля структуры, требуемый триггер, паттерн)
+# Правила применяются к отдельным полям, извлечённым WorkflowParser, а не ко всему
+# файлу целиком - так паттерн не может "склеить" несвязанные jobs и работает линейно
 WORKFLOW_MALICIOUS_PATTERNS = {
-    'discussion_injection': r'on:\s*discussion:.*\$\{\{\s*github\.event\.discussion\.body\s*\}\}',
-    'self_hosted_runner': r'runs-on:\s*self-hosted',
-    'formatter_workflow': r'formatter_\d+\.yml',
-    'secrets_artifact': r'(?:secrets|credentials|cloud|environment|truffle).*\.(?:json|txt)',
+    'discussion_injection': (('run', 'with', 'env'), 'discussion', r'\$\{\{\s*github\.event\.discussion\.body\s*\}\}'),
+    'self_hosted_runner': (('runs_on',), None, r'^self-hosted$'),
+    'formatter_workflow': (('run',), None, r'formatter_\d+\.ya?ml'),
+    'secrets_artifact': (('upload_artifact',), None, r'(?i)(?:secrets|credentials|cloud|environment|truffle)[\w.-]*\.(?:json|txt)\b'),
 }
 
+# Файлы composite actions
+ACTION_FILE_NAMES = ('action.yml', 'action.yaml')
+
+# Известные вредоносные файлы
+KNOWN_MALICIOUS_FILES = ['setup_bun.js', 'bun_environment.js']
+
+# Расширения JS/TS файлов для глубокого сканирования
+JS_FILE_EXTENSIONS = ('.js', '.ts', '.jsx', '.tsx')
+
+# Каталоги, которые не обходятся ни при сканировании, ни в режиме наблюдения
+SKIP_DIRS = {'node_modules', '.git'}
+
+# Режим наблюдения (--watch)
+WATCH_DEBOUNCE_SECONDS = 1.0    # тишина после последнего события перед пересканированием
+WATCH_MAX_BATCH_SECONDS = 10.0  # не откладывать пересканирование дольше (npm install)
+WATCH_POLL_INTERVAL = 2.0
+
 
-def load_compromised_packages(update: bool = False) -> Dict[str, List[str]]:
-    """Загрузка списка скомпрометированных пакетов"""
+def _iocs_source_stamp() -> List[int]:
+    stat = LOCAL_IOCS_FILE.stat()
+    return [IOCS_SNAPSHOT_VERSION, stat.st_mtime_ns, stat.st_size]
+
+
+def _load_iocs_snapshot() -> Optional[Dict[str, List[str]]]:
+    """Чтение marshal кэша IOCs, None если кэш отсутствует или устарел"""
+    import marshal
+
+    try:
+        with open(LOCAL_IOCS_SNAPSHOT, 'rb') as f:
+            snapshot = marshal.load(f)
+        if snapshot.get('source') == _iocs_source_stamp():
+            return snapshot['packages']
+    except (OSError, EOFError, ValueError, TypeError, AttributeError):
+        pass
+    return None
+
+
+def _save_iocs_snapshot(compromised: Dict[str, List[str]]):
+    """Запись marshal кэша IOCs (ошибки записи игнорируются, например read-only каталог)"""
+    import marshal
+
+    tmp_path = LOCAL_IOCS_SNAPSHOT.with_name(f"{LOCAL_IOCS_SNAPSHOT.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, 'wb') as f:
+            marshal.dump({'source': _iocs_source_stamp(), 'packages': compromised}, f)
+        os.replace(tmp_path, LOCAL_IOCS_SNAPSHOT)
+    except OSError:
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
+
+
+def load_compromised_packages(update: bool = False, verbose: bool = True,
+                              use_snapshot: bool = False) -> Dict[str, List[str]]:
+    """Загрузка списка скомпрометированных пакетов (verbose=False - без вывода в stdout)"""
+    log = print if verbose else (lambda *args, **kwargs: None)
 
     # Попытка обновить из GitHub
     if update and not LOCAL_IOCS_FILE.exists():
-        print("📥 Загрузка актуального списка IOCs из GitHub...")
+        log("📥 Загрузка актуального списка IOCs из GitHub...")
         try:
+            # Сетевой стек импортируем только при реальной загрузке
+            import urllib.request
+
             urllib.request.urlretrieve(DATADOG_IOCS_URL, LOCAL_IOCS_FILE)
-            print(f"✅ Список обновлен: {LOCAL_IOCS_FILE}")
+            log(f"✅ Список обновлен: {LOCAL_IOCS_FILE}")
         except Exception as e:
-            print(f"⚠️  Не удалось загрузить список: {e}")
-            print("   Используется fallback список")
+            log(f"⚠️  Не удалось загрузить список: {e}")
+            log("   Используется fallback список")
 
-    # Загрузка из локального CSV
+    # Загрузка из локального CSV (или его marshal кэша)
     if LOCAL_IOCS_FILE.exists():
+        compromised = _load_iocs_snapshot() if use_snapshot else None
+        if compromised is not None:
+            log(f"✅ Загружено {len(compromised)} скомпрометированных пакетов из IOCs (кэш)")
+            return compromised
+
         try:
+            import csv
+
             compromised = {}
             with open(LOCAL_IOCS_FILE, 'r', encoding='utf-8') as f:
                 reader = csv.DictReader(f)
@@ -106,43 +189,46 @@ def load_compromised_packages(update: bool = False) -> Dict[str, List[str]]:
                     versions = [v.strip() for v in versions]
                     compromised[package_name] = versions
 
-            print(f"✅ Загружено {len(compromised)} скомпрометированных пакетов из IOCs")
+            if use_snapshot:
+                _save_iocs_snapshot(compromised)
+            log(f"✅ Загружено {len(compromised)} скомпрометированных пакетов из IOCs")
             return compromised
         except Exception as e:
-            print(f"⚠️  Ошибка чтения IOCs: {e}")
+            log(f"⚠️  Ошибка чтения IOCs: {e}")
 
-    print(f"⚠️  Используется fallback список ({len(FALLBACK_COMPROMISED_PACKAGES)} пакетов)")
+    log(f"⚠️  Используется fallback список ({len(FALLBACK_COMPROMISED_PACKAGES)} пакетов)")
     return FALLBACK_COMPROMISED_PACKAGES
 
 
 class LockFileParser:
-    """Парсер для различных типов lock файлов"""
+    """Парсер для различных типов lock файлов
 
-    @staticmethod
-    def parse_package_lock(lock_path: Path) -> Dict[str, str]:
-        """Парсинг package-lock.json (npm)"""
-        try:
-            with open(lock_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+    Методы parse_*_content разбирают уже прочитанный текст и пробрасывают ошибки,
+    методы parse_* читают файл и, как раньше, печатают ошибку и возвращают {}.
+    """
 
-            packages = {}
+    YARN_ENTRY = re.compile(r'"?([^"@\s]+)@[^"]*"?:\s*\n\s*version\s+"([^"]+)"')
+    PNPM_PACKAGE_LINE = re.compile(r'\s+[\'"]?/(.+?)[@/](\d+\.\d+\.\d+[^\s:\'"]*)[\'":]')
 
-            # npm v1/v2 format
-            if 'dependencies' in data:
-                LockFileParser._extract_npm_v1_deps(data['dependencies'], packages)
+    @staticmethod
+    def parse_package_lock_content(content: str) -> Dict[str, str]:
+        """Парсинг содержимого package-lock.json (npm)"""
+        data = json.loads(content)
+        packages = {}
 
-            # npm v3 (lockfileVersion 3) format
-            if 'packages' in data:
-                for pkg_path, pkg_data in data['packages'].items():
-                    if pkg_path and pkg_path != '':
-                        pkg_name = pkg_path.replace('node_modules/', '')
-                        if 'version' in pkg_data:
-                            packages[pkg_name] = pkg_data['version']
+        # npm v1/v2 format
+        if 'dependencies' in data:
+            LockFileParser._extract_npm_v1_deps(data['dependencies'], packages)
 
-            return packages
-        except Exception as e:
-            print(f"⚠️  Ошибка парсинга package-lock.json: {e}")
-            return {}
+        # npm v3 (lockfileVersion 3) format
+        if 'packages' in data:
+            for pkg_path, pkg_data in data['packages'].items():
+                if pkg_path and pkg_path != '':
+                    pkg_name = pkg_path.replace('node_modules/', '')
+                    if 'version' in pkg_data:
+                        packages[pkg_name] = pkg_data['version']
+
+        return packages
 
     @staticmethod
     def _extract_npm_v1_deps(deps: Dict, packages: Dict[str, str]):
@@ -154,315 +240,847 @@ class LockFileParser:
                     LockFileParser._extract_npm_v1_deps(data['dependencies'], packages)
 
     @staticmethod
-    def parse_yarn_lock(lock_path: Path) -> Dict[str, str]:
-        """Парсинг yarn.lock"""
-        try:
-            with open(lock_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+    def parse_yarn_lock_content(content: str) -> Dict[str, str]:
+        """Парсинг содержимого yarn.lock"""
+        packages = {}
+        matches = LockFileParser.YARN_ENTRY.findall(content)
 
-            packages = {}
-            pattern = r'"?([^"@\s]+)@[^"]*"?:\s*\n\s*version\s+"([^"]+)"'
-            matches = re.findall(pattern, content)
+        for pkg_name, version in matches:
+            packages[pkg_name] = version
 
-            for pkg_name, version in matches:
-                packages[pkg_name] = version
+        return packages
 
-            return packages
+    @staticmethod
+    def parse_pnpm_lock_content(content: str) -> Dict[str, str]:
+        """Парсинг содержимого pnpm-lock.yaml (простой встроенный парсер без зависимостей)"""
+        packages = {}
+
+        # Простой парсинг для pnpm v6+ (секция packages:)
+        # Формат: /package/version или /package@version
+        in_packages_section = False
+        for line in content.split('\n'):
+            # Определяем секцию packages
+            if line.strip() == 'packages:':
+                in_packages_section = True
+                continue
+            
+            # Выход из секции при новой top-level секции
+            if in_packages_section and line and not line.startswith(' ') and not line.startswith('\t'):
+                in_packages_section = False
+            
+            if in_packages_section and line.strip():
+                # Ищем строки вида: '/package/version:' или '/package@version:'
+                match = LockFileParser.PNPM_PACKAGE_LINE.match(line)
+                if match:
+                    pkg_name = match.group(1)
+                    version = match.group(2)
+                    packages[pkg_name] = version
+
+        return packages
+
+    @staticmethod
+    def _parse_file(lock_path: Path, parser) -> Dict[str, str]:
+        try:
+            with open(lock_path, 'r', encoding='utf-8') as f:
+                return parser(f.read())
         except Exception as e:
-            print(f"⚠️  Ошибка парсинга yarn.lock: {e}")
+            print(f"⚠️  Ошибка парсинга {lock_path.name}: {e}")
             return {}
 
+    @staticmethod
+    def parse_package_lock(lock_path: Path) -> Dict[str, str]:
+        """Парсинг package-lock.json (npm)"""
+        return LockFileParser._parse_file(lock_path, LockFileParser.parse_package_lock_content)
+
+    @staticmethod
+    def parse_yarn_lock(lock_path: Path) -> Dict[str, str]:
+        """Парсинг yarn.lock"""
+        return LockFileParser._parse_file(lock_path, LockFileParser.parse_yarn_lock_content)
+
     @staticmethod
     def parse_pnpm_lock(lock_path: Path) -> Dict[str, str]:
-        """Парсинг pnpm-lock.yaml (простой встроенный парсер без зависимостей)"""
-        try:
-            with open(lock_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+        """Парсинг pnpm-lock.yaml"""
+        return LockFileParser._parse_file(lock_path, LockFileParser.parse_pnpm_lock_content)
+
+
+# Поддерживаемые lock файлы: имя файла -> (тип, парсер содержимого)
+LOCK_FILE_PARSERS = {
+    'package-lock.json': ('npm', LockFileParser.parse_package_lock_content),
+    'yarn.lock': ('yarn', LockFileParser.parse_yarn_lock_content),
+    'pnpm-lock.yaml': ('pnpm', LockFileParser.parse_pnpm_lock_content),
+}
+
+
+class WorkflowParser:
+    """Лёгкий структурный парсер GitHub Actions workflows и composite actions
 
-            packages = {}
+    Не является полноценным YAML парсером: за один проход по строкам извлекает
+    только поля, нужные правилам - триггеры `on:`, `jobs.*.runs-on`,
+    `steps[*].run`, значения `with:` (шагов и reusable workflows), значения `env:`
+    (любого уровня) и шаги `uses: actions/upload-artifact`.
+    """
 
-            # Простой парсинг для pnpm v6+ (секция packages:)
-            # Формат: /package/version или /package@version
-            in_packages_section = False
-            for line in content.split('\n'):
-                # Определяем секцию packages
-                if line.strip() == 'packages:':
-                    in_packages_section = True
+    BLOCK_SCALAR = re.compile(r'^[|>][+-]?\d*$')
+
+    @staticmethod
+    def parse(content: str) -> List[Dict]:
+        """Разбор файла на YAML документы (разделитель `---`)"""
+        documents = []
+        lines = content.split('\n')
+        doc = WorkflowParser._new_document()
+        # Стек контекста: (отступ, ключ), элементы списков помечаются ключом '-'
+        stack: List[Tuple[int, str]] = []
+        step: Optional[Dict] = None
+        i = 0
+
+        while i < len(lines):
+            raw = lines[i].rstrip()
+            line_num = i + 1
+            i += 1
+            stripped = raw.strip()
+
+            if stripped in ('---', '...') or stripped.startswith('--- '):
+                WorkflowParser._close_step(doc, step)
+                documents.append(doc)
+                doc = WorkflowParser._new_document()
+                stack = []
+                step = None
+                continue
+
+            if not stripped or stripped.startswith('#'):
+                continue
+
+            indent = len(raw) - len(raw.lstrip())
+            is_item = stripped == '-' or stripped.startswith('- ')
+
+            if is_item:
+                while stack and (stack[-1][0] > indent or (stack[-1][0] == indent and stack[-1][1] == '-')):
+                    stack.pop()
+                body = stripped[1:].lstrip()
+                key_indent = indent + len(stripped) - len(body)
+                path = [key for _, key in stack]
+                if path[-1:] == ['steps']:
+                    WorkflowParser._close_step(doc, step)
+                    step = {'line': line_num, 'uses': '', 'run': [], 'with': {}}
+                    step['path'] = path
+                stack.append((indent, '-'))
+                if not body:
                     continue
-                
-                # Выход из секции при новой top-level секции
-                if in_packages_section and line and not line.startswith(' ') and not line.startswith('\t'):
-                    in_packages_section = False
-                
-                if in_packages_section and line.strip():
-                    # Ищем строки вида: '/package/version:' или '/package@version:'
-                    match = re.match(r'\s+[\'"]?/(.+?)[@/](\d+\.\d+\.\d+[^\s:\'"]*)[\'":]', line)
-                    if match:
-                        pkg_name = match.group(1)
-                        version = match.group(2)
-                        packages[pkg_name] = version
-
-            return packages
-        except Exception as e:
-            print(f"⚠️  Ошибка парсинга pnpm-lock.yaml: {e}")
-            return {}
+                if body.startswith('{'):
+                    # Шаг в flow-виде `- { run: ..., uses: ... }` - проверяем сырой текст шага
+                    continuation, i = WorkflowParser._consume_deeper(lines, i, indent)
+                    text = ' '.join([body] + continuation)
+                    if step is not None and step['line'] == line_num:
+                        step['run'].append((line_num, text))
+                        if 'actions/upload-artifact' in text:
+                            step['uses'] = 'actions/upload-artifact'
+                            step['with']['_flow'] = (line_num, text)
+                    continue
+            else:
+                body = stripped
+                key_indent = indent
+                while stack and stack[-1][0] >= key_indent:
+                    stack.pop()
+
+            path = [key for _, key in stack]
+            key_value = WorkflowParser._split_key(body)
+
+            if key_value is None:
+                # Скалярный элемент списка: `on: [..]` в блочном виде или метка runs-on
+                if is_item:
+                    WorkflowParser._add_scalar(doc, path, body, line_num)
+                continue
 
+            key, value = key_value
+            header = value.split(' #', 1)[0].strip() if not value.startswith('#') else ''
 
-class ShaiHuludDetectorFinal:
-    def __init__(self, project_path: str, update_iocs: bool = False, deep_scan: bool = True):
-        self.project_path = Path(project_path)
-        self.findings: List[Dict] = []
-        self.all_packages: Dict[str, str] = {}
-        self.compromised_packages = load_compromised_packages(update=update_iocs)
-        self.deep_scan = deep_scan
-        self.scanned_files = 0
-        self.start_time = datetime.now()
+            if WorkflowParser.BLOCK_SCALAR.match(header):
+                # Блочный скаляр (`run: | # комментарий`) - забираем все строки с большим отступом
+                block, i = WorkflowParser._consume_deeper(lines, i, key_indent)
+                value = '\n'.join(block).strip()
+            elif header:
+                # Многострочный plain/quoted скаляр: строки продолжения с большим отступом
+                continuation, i = WorkflowParser._consume_deeper(lines, i, key_indent)
+                if continuation:
+                    value = ' '.join([value] + continuation)
+            else:
+                value = ''
 
-    def scan(self) -> bool:
-        """Выполнить полное сканирование проекта"""
-        print(f"\n🔍 Сканирование проекта: {self.project_path}")
-        print("=" * 70)
+            WorkflowParser._add_key(doc, path, key, value, line_num, step)
+            stack.append((key_indent, key))
 
-        if self.project_path.is_file():
-            project_dir = self.project_path.parent
+        WorkflowParser._close_step(doc, step)
+        documents.append(doc)
+        return documents
+
+    @staticmethod
+    def _split_key(body: str) -> Optional[Tuple[str, str]]:
+        """Разбор `key: value` за линейное время, None если строка не пара ключ-значение"""
+        if body[0] in '"\'':
+            end = body.find(body[0], 1)
+            if end < 0:
+                return None
+            key = body[1:end]
+            rest = body[end + 1:].lstrip()
+            if not rest.startswith(':'):
+                return None
+            rest = rest[1:]
         else:
-            project_dir = self.project_path
+            if body[0] in '#{[':
+                return None
+            colon = body.find(': ')
+            if colon < 0:
+                if not body.endswith(':'):
+                    return None
+                colon = len(body) - 1
+            key = body[:colon]
+            rest = body[colon + 1:]
+
+        if rest and not rest[0].isspace():
+            return None
+        key = key.strip()
+        if not key:
+            return None
+        return key, rest.strip()
 
-        # Сканирование зависимостей
-        self._scan_dependencies(project_dir)
-        
-        # Глубокое сканирование файлов (если включено)
-        if self.deep_scan:
-            print(f"\n� Глубокое сканирование исходного кода...")
-            self._scan_js_files(project_dir)
-            self._scan_workflows(project_dir)
-            self._scan_malicious_files(project_dir)
+    @staticmethod
+    def _consume_deeper(lines: List[str], i: int, indent: int) -> Tuple[List[str], int]:
+        """Забирает строки с отступом больше indent (и пустые), начиная с i"""
+        block = []
+        while i < len(lines):
+            next_line = lines[i].rstrip()
+            if next_line.strip() and len(next_line) - len(next_line.lstrip()) <= indent:
+                break
+            block.append(next_line.strip())
+            i += 1
+        while block and not block[-1]:
+            block.pop()
+        return block, i
 
-        return self._print_results()
+    @staticmethod
+    def _new_document() -> Dict:
+        return {
+            'triggers': set(),
+            'runs_on': [],
+            'run': [],
+            'with': [],
+            'env': [],
+            'upload_artifact': [],
+        }
 
-    def _scan_dependencies(self, project_dir: Path):
-        """Сканирование файлов зависимостей"""
-        print(f"\n�📦 Поиск файлов зависимостей...")
-
-        # Сканируем package.json
-        package_json_path = project_dir / 'package.json'
-        if package_json_path.exists():
-            print(f"  ✓ package.json")
-            self._scan_package_json(package_json_path)
-            self.scanned_files += 1
-
-        # Сканируем lock файлы
-        lock_files_found = []
-
-        package_lock_path = project_dir / 'package-lock.json'
-        if package_lock_path.exists():
-            print(f"  ✓ package-lock.json")
-            lock_files_found.append('npm')
-            packages = LockFileParser.parse_package_lock(package_lock_path)
-            self._check_lock_packages(packages, 'package-lock.json')
-            self.scanned_files += 1
-
-        yarn_lock_path = project_dir / 'yarn.lock'
-        if yarn_lock_path.exists():
-            print(f"  ✓ yarn.lock")
-            lock_files_found.append('yarn')
-            packages = LockFileParser.parse_yarn_lock(yarn_lock_path)
-            self._check_lock_packages(packages, 'yarn.lock')
-            self.scanned_files += 1
-
-        pnpm_lock_path = project_dir / 'pnpm-lock.yaml'
-        if pnpm_lock_path.exists():
-            print(f"  ✓ pnpm-lock.yaml")
-            lock_files_found.append('pnpm')
-            packages = LockFileParser.parse_pnpm_lock(pnpm_lock_path)
-            self._check_lock_packages(packages, 'pnpm-lock.yaml')
-            self.scanned_files += 1
-
-        bun_lock_path = project_dir / 'bun.lockb'
-        if bun_lock_path.exists():
-            print(f"  ⚠️  bun.lockb (бинарный формат - не поддерживается)")
+    @staticmethod
+    def _unquote(value: str) -> str:
+        value = value.split(' #', 1)[0].strip()
+        if len(value) >= 2 and value[0] == value[-1] and value[0] in '"\'':
+            return value[1:-1]
+        return value
 
-        if not lock_files_found and not package_json_path.exists():
-            print(f"\n⚠️  Не найдено файлов зависимостей в {project_dir}")
+    @staticmethod
+    def _split_flow(value: str) -> List[str]:
+        """Разбор значения `a` или `[a, b]` в список"""
+        value = WorkflowParser._unquote(value)
+        if value.startswith('[') and value.endswith(']'):
+            value = value[1:-1]
+        return [WorkflowParser._unquote(v) for v in value.split(',') if v.strip()]
 
-        if self.all_packages:
-            print(f"\n📊 Проверено пакетов: {len(self.all_packages)}")
-        print(f"📊 База IOCs: {len(self.compromised_packages)} скомпрометированных пакетов")
+    @staticmethod
+    def _add_scalar(doc: Dict, path: List[str], value: str, line_num: int):
+        if path[:1] == ['on'] and len(path) == 2:
+            doc['triggers'].update(WorkflowParser._split_flow(value))
+        elif len(path) == 4 and path[0] == 'jobs' and path[2] == 'runs-on':
+            for label in WorkflowParser._split_flow(value):
+                doc['runs_on'].append((line_num, label))
 
-    def _scan_js_files(self, project_dir: Path):
-        """Сканирование JS/TS файлов на паттерны атаки"""
-        # Паттерны для поиска JS/TS файлов
-        patterns = ['**/*.js', '**/*.ts', '**/*.jsx', '**/*.tsx']
-        
-        js_files = []
-        for pattern in patterns:
-            for file_path in project_dir.glob(pattern):
-                # Пропускаем node_modules и скрытые папки
-                if 'node_modules' in file_path.parts or any(p.startswith('.') for p in file_path.parts[:-1]):
-                    continue
-                js_files.append(file_path)
-        
-        if not js_files:
+    @staticmethod
+    def _add_key(doc: Dict, path: List[str], key: str, value: str, line_num: int, step: Optional[Dict]):
+        if not path and key in ('on', 'true'):
+            if value:
+                doc['triggers'].update(WorkflowParser._split_flow(value))
+        elif path == ['on']:
+            doc['triggers'].add(key)
+        elif path[-1:] == ['env'] or key == 'env' and value.startswith('{'):
+            # env: на уровне workflow, job или шага (блочный или flow вид)
+            if value:
+                doc['env'].append((line_num, value))
+        elif len(path) == 2 and path[0] == 'jobs' and key == 'runs-on':
+            if value and not value.startswith('{'):
+                for label in WorkflowParser._split_flow(value):
+                    doc['runs_on'].append((line_num, label))
+        elif step is not None and path == step['path'] + ['-']:
+            if key == 'run':
+                step['run'].append((line_num, value))
+            elif key == 'uses':
+                step['uses'] = WorkflowParser._unquote(value)
+            elif key == 'with' and value.startswith('{'):
+                step['with']['_flow'] = (line_num, value)
+        elif step is not None and path == step['path'] + ['-', 'with'] and value:
+            step['with'][key] = (line_num, WorkflowParser._unquote(value))
+        elif len(path) == 3 and path[0] == 'jobs' and path[2] == 'with' and value:
+            # Входы reusable workflow: jobs.<id>.with
+            doc['with'].append((line_num, value))
+        elif len(path) == 2 and path[0] == 'jobs' and key == 'with' and value.startswith('{'):
+            doc['with'].append((line_num, value))
+
+    @staticmethod
+    def _close_step(doc: Dict, step: Optional[Dict]):
+        if step is None:
             return
-        
-        print(f"  📄 Найдено {len(js_files)} JS/TS файлов для анализа...")
-        
-        for file_path in js_files:
-            self._scan_js_file(file_path)
-            self.scanned_files += 1
+        doc['run'].extend(step['run'])
+        doc['with'].extend(step['with'].values())
+        if step['uses'].startswith('actions/upload-artifact'):
+            doc['upload_artifact'].extend(step['with'].values())
+
+
+class InotifyWatcher:
+    """Наблюдение за деревом проекта через inotify (Linux, через ctypes)"""
+
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ISDIR = 0x40000000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+    WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+    def __init__(self, root: Path):
+        import ctypes
+        import ctypes.util
+
+        if not sys.platform.startswith('linux'):
+            raise OSError("inotify доступен только в Linux")
+
+        self._ctypes = ctypes
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.root = root
+        self.fd = self._libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        self.watches: Dict[int, Path] = {}
+        try:
+            self._add_tree(root)
+        except OSError:
+            self.close()
+            raise
+
+    def _add_tree(self, directory: Path) -> List[Path]:
+        """Рекурсивная подписка на каталог, возвращает уже существующие файлы
+
+        Каталоги, удалённые во время обхода (обычное дело для сборки), пропускаются;
+        прочие ошибки (например, ENOSPC - исчерпан лимит watches) пробрасываются.
+        """
+        import errno
+
+        existing = []
+        for root, dirs, files in os.walk(directory):
+            dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(root), self.WATCH_MASK)
+            if wd < 0:
+                error = self._ctypes.get_errno()
+                if error in (errno.ENOENT, errno.ENOTDIR):
+                    dirs[:] = []
+                    continue
+                raise OSError(error, f"inotify_add_watch: {root}")
+            self.watches[wd] = Path(root)
+            existing.extend(Path(root) / name for name in files)
+        return existing
+
+    def wait(self, timeout: Optional[float]) -> Optional[Set[Path]]:
+        """Ожидание событий (не дольше timeout секунд)
+
+        Возвращает изменённые пути (возможно пустое множество, если события были,
+        но не относятся к файлам) или None, если за timeout событий не было.
+        """
+        import select
+        import struct
+
+        changed: Set[Path] = set()
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return None
 
-    def _scan_js_file(self, file_path: Path):
-        """Сканирование одного JS/TS файла"""
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-            
-            # Проверка на индикаторы в содержимом
-            for indicator in MALICIOUS_INDICATORS:
-                if indicator in content:
-                    self.findings.append({
-                        'severity': 'CRITICAL',
-                        'type': 'malicious_indicator_in_file',
-                        'file': str(file_path.relative_to(self.project_path)),
-                        'indicator': indicator,
-                        'message': f'Индикатор Shai-Hulud в файле: {indicator}'
-                    })
-            
-            # Проверка на вредоносные паттерны
-            for pattern_name, pattern_regex in JS_MALICIOUS_PATTERNS.items():
-                matches = re.finditer(pattern_regex, content, re.MULTILINE | re.DOTALL)
-                for match in matches:
-                    # Определяем severity в зависимости от паттерна
-                    severity = 'CRITICAL' if pattern_name in [
-                        'credential_theft_git', 'credential_theft_npm', 'credential_theft_aws',
-                        'trufflehog_usage', 'ioc_files', 'home_destruction', 'runner_registration'
-                    ] else 'HIGH' if pattern_name in [
-                        'github_exfiltration', 'metadata_service', 'bun_install'
-                    ] else 'WARNING'
-                    
-                    # Получаем номер строки
-                    line_num = content[:match.start()].count('\n') + 1
-                    
-                    self.findings.append({
-                        'severity': severity,
-                        'type': f'js_pattern_{pattern_name}',
-                        'file': str(file_path.relative_to(self.project_path)),
-                        'line': line_num,
-                        'pattern': pattern_name,
-                        'message': f'Обнаружен паттерн {pattern_name} (строка {line_num})'
-                    })
-        
-        except Exception as e:
-            # Игнорируем ошибки чтения файлов
-            pass
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, name_len = struct.unpack_from('iIII', data, offset)
+            name = data[offset + 16:offset + 16 + name_len].split(b'\0', 1)[0]
+            offset += 16 + name_len
+
+            if mask & self.IN_Q_OVERFLOW:
+                # Очередь событий переполнена - пересканируем всё дерево
+                changed.update(self._add_tree(self.root))
+                continue
+            if mask & self.IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+            if wd not in self.watches or not name:
+                continue
 
-    def _scan_workflows(self, project_dir: Path):
-        """Сканирование GitHub Actions workflows"""
-        workflows_dir = project_dir / '.github' / 'workflows'
-        
-        if not workflows_dir.exists():
-            return
-        
-        workflow_files = list(workflows_dir.glob('*.yml')) + list(workflows_dir.glob('*.yaml'))
-        
-        if not workflow_files:
-            return
-        
-        print(f"  🔧 Найдено {len(workflow_files)} workflow файлов...")
-        
-        for workflow_file in workflow_files:
-            self._scan_workflow_file(workflow_file)
-            self.scanned_files += 1
+            path = self.watches[wd] / os.fsdecode(name)
+            if mask & self.IN_ISDIR:
+                if path.name not in SKIP_DIRS and mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                    changed.update(self._add_tree(path))
+            elif mask & (self.IN_CLOSE_WRITE | self.IN_MOVED_TO):
+                changed.add(path)
+        return changed
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class PollingWatcher:
+    """Fallback наблюдение: периодическое сравнение mtime/size файлов"""
+
+    def __init__(self, root: Path, interval: float = WATCH_POLL_INTERVAL):
+        self.root = root
+        self.interval = interval
+        self.snapshot = self._take_snapshot()
+
+    def _take_snapshot(self) -> Dict[Path, Tuple[float, int]]:
+        snapshot = {}
+        for root, dirs, files in os.walk(self.root):
+            dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+            for name in files:
+                path = Path(root) / name
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                snapshot[path] = (stat.st_mtime, stat.st_size)
+        return snapshot
+
+    def wait(self, timeout: Optional[float]) -> Optional[Set[Path]]:
+        """Ожидание изменений (не дольше timeout секунд), None если изменений не было"""
+        time.sleep(self.interval if timeout is None else min(self.interval, timeout))
+        snapshot = self._take_snapshot()
+        changed = {path for path, state in snapshot.items() if self.snapshot.get(path) != state}
+        self.snapshot = snapshot
+        return changed or None
+
+    def close(self):
+        pass
+
+
+def create_watcher(root: Path):
+    """inotify, если доступен, иначе polling"""
+    try:
+        return InotifyWatcher(root)
+    except (OSError, AttributeError) as e:
+        print(f"⚠️  inotify недоступен ({e}), используется polling раз в {WATCH_POLL_INTERVAL:.0f}s")
+        return PollingWatcher(root)
+
+
+def classify_file(name: str) -> Optional[str]:
+    """Тип файла для сканирования по его (относительному) пути или None"""
+    path = PurePosixPath(name.replace('\\', '/'))
+    file_name = path.name
+
+    if file_name == 'package.json':
+        return 'package_json'
+    if file_name in LOCK_FILE_PARSERS:
+        return 'lockfile'
+    if file_name in ACTION_FILE_NAMES:
+        return 'action'
+    if file_name.endswith(('.yml', '.yaml')) and path.parts[-3:-1] == ('.github', 'workflows'):
+        return 'workflow'
+    if file_name.endswith(JS_FILE_EXTENSIONS):
+        return 'js'
+    return None
+
+
+def classify_tree_file(name: str) -> Optional[str]:
+    """Тип файла при обходе дерева проекта (путь относительно корня) или None
+
+    В отличие от classify_file учитывает правила обхода: файлы в SKIP_DIRS и
+    package.json/lock файлы вложенных проектов не сканируются, JS/TS в скрытых
+    каталогах (.github, .cache, ...) проверяются только по имени ('js_name').
+    """
+    parts = PurePosixPath(name.replace('\\', '/')).parts
+    if any(part in SKIP_DIRS for part in parts[:-1]):
+        return None
+
+    kind = classify_file(name)
+    if kind in ('package_json', 'lockfile') and len(parts) > 1:
+        return None
+    if kind == 'js' and any(part.startswith('.') for part in parts[:-1]):
+        return 'js_name'
+    return kind
+
+
+class ScanResult:
+    """Результат сканирования: находки, проверенные пакеты и файлы"""
+
+    def __init__(self, target: str = ''):
+        self.target = target
+        self.findings: List[Dict] = []
+        self.packages: Dict[str, str] = {}
+        self.scanned_files: List[str] = []
+        self.errors: List[str] = []
+        # Причина досрочной остановки: 'fail_fast' или 'time_budget'
+        self.stop_reason: Optional[str] = None
+
+    @property
+    def partial(self) -> bool:
+        """Сканирование остановлено досрочно, часть файлов не проверена"""
+        return self.stop_reason is not None
+
+    def count(self, severity: str) -> int:
+        return sum(1 for f in self.findings if f['severity'] == severity)
+
+    @property
+    def is_clean(self) -> bool:
+        """Нет CRITICAL находок"""
+        return self.count('CRITICAL') == 0
+
+    def merge(self, other: 'ScanResult'):
+        self.findings.extend(other.findings)
+        self.packages.update(other.packages)
+        self.scanned_files.extend(other.scanned_files)
+        self.errors.extend(other.errors)
+
+
+class ScannerEngine:
+    """Переиспользуемый движок сканирования, ничего не печатает в stdout
+
+    IOC индекс и скомпилированные правила создаются один раз в конструкторе и
+    дальше не изменяются, поэтому один экземпляр можно использовать из нескольких
+    потоков. Каждый вызов scan_* возвращает новый ScanResult.
+    """
+
+    VERSION_PREFIX = re.compile(r'^[^0-9]*')
+    FORMATTER_WORKFLOW_NAME = re.compile(r'formatter_\d+\.ya?ml')
+
+    def __init__(self, compromised_packages: Optional[Dict[str, List[str]]] = None,
+                 update_iocs: bool = False, verbose: bool = False, use_snapshot: bool = False):
+        if compromised_packages is None:
+            compromised_packages = load_compromised_packages(update=update_iocs, verbose=verbose,
+                                                             use_snapshot=use_snapshot)
+
+        self.compromised_packages = MappingProxyType({
+            name: frozenset(versions) for name, versions in compromised_packages.items()
+        })
+        self.js_rules = tuple(
+            (name, JS_PATTERN_SEVERITY.get(name, 'WARNING'), re.compile(regex, re.MULTILINE | re.DOTALL))
+            for name, regex in JS_MALICIOUS_PATTERNS.items()
+        )
+        self.workflow_rules = tuple(
+            (name, fields, trigger, re.compile(regex))
+            for name, (fields, trigger, regex) in WORKFLOW_MALICIOUS_PATTERNS.items()
+        )
+        self.script_rules = tuple(re.compile(pattern) for pattern in SUSPICIOUS_SCRIPT_PATTERNS)
+
+    def scan_path(self, path, deep_scan: bool = True, fail_fast: bool = False,
+                  time_budget: Optional[float] = None) -> ScanResult:
+        """Сканирование проекта (каталога) или одного файла
+
+        Работа упорядочена по ожидаемой отдаче: файлы зависимостей корня (их пути
+        известны без обхода дерева, поэтому они проверяются первыми и time_budget их
+        не пропускает), известные вредоносные имена файлов, workflows, JS/TS.
+        fail_fast останавливает сканирование на первой CRITICAL находке, time_budget
+        (секунды) - по истечении времени; в обоих случаях результат помечается как
+        частичный (result.partial).
+        Несуществующий путь - FileNotFoundError, файл неподдерживаемого типа - ValueError.
+        """
+        path = Path(path)
+        if not path.exists():
+            raise FileNotFoundError(f"Путь не существует: {path}")
+        if path.is_file():
+            return self.scan_file(path, path.parent, deep_scan=deep_scan)
+
+        result = ScanResult(str(path))
+        deadline = time.monotonic() + time_budget if time_budget is not None else None
+
+        dependency_files = [path / name for name in ['package.json'] + list(LOCK_FILE_PARSERS)]
+        for file_path in [p for p in dependency_files if p.exists()]:
+            if fail_fast and not result.is_clean:
+                result.stop_reason = 'fail_fast'
+                return result
+            result.merge(self.scan_file(file_path, path))
+
+        if not deep_scan:
+            return result
+        if fail_fast and not result.is_clean:
+            result.stop_reason = 'fail_fast'
+            return result
+
+        workflow_files: List[Path] = []
+        js_files: List[Path] = []
+        result.stop_reason = self._collect_tree(path, result, workflow_files, js_files, deadline, fail_fast)
+        if result.partial:
+            return result
+
+        critical_found = not result.is_clean
+        for file_path in workflow_files + js_files:
+            if fail_fast and critical_found:
+                result.stop_reason = 'fail_fast'
+                break
+            if deadline is not None and time.monotonic() >= deadline:
+                result.stop_reason = 'time_budget'
+                break
+
+            file_result = self.scan_file(file_path, path, check_name=False)
+            critical_found = critical_found or not file_result.is_clean
+            result.merge(file_result)
+
+        return result
+
+    def scan_file(self, file_path, root, deep_scan: bool = True, check_name: bool = True) -> ScanResult:
+        """Сканирование одного файла, пути в находках - относительно root
+
+        Неподдерживаемый тип файла - ValueError, как в scan_bytes. Если файл
+        пропущен из-за deep_scan=False, это отмечается в result.errors.
+        """
+        file_path = Path(file_path)
+        name = file_path.relative_to(root).as_posix()
+        if classify_file(name) is None:
+            raise ValueError(f"Неподдерживаемый тип файла: {name}")
 
-    def _scan_workflow_file(self, file_path: Path):
-        """Сканирование workflow файла"""
+        result = ScanResult(name)
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
+            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
                 content = f.read()
-            
-            # Проверка имени файла
-            if file_path.name == 'discussion.yaml' or file_path.name == 'discussion.yml':
-                self.findings.append({
+        except OSError as e:
+            result.errors.append(f"Ошибка чтения {name}: {e}")
+            return result
+
+        if not self._scan_content(name, content, result, deep_scan, check_name):
+            result.errors.append(f"{name} не проверен: глубокое сканирование отключено (deep_scan=False)")
+        return result
+
+    def scan_tree_file(self, file_path, root, deep_scan: bool = True) -> ScanResult:
+        """Сканирование файла из дерева проекта по тем же правилам отбора, что и scan_path
+
+        Используется для инкрементального пересканирования (--watch): файлы, которые
+        scan_path пропускает (node_modules, вложенные package.json, JS/TS в скрытых
+        каталогах), дают пустой результат или только проверку имени.
+        """
+        file_path = Path(file_path)
+        name = file_path.relative_to(root).as_posix()
+        kind = classify_tree_file(name)
+
+        if kind in ('package_json', 'lockfile') or (deep_scan and kind in ('workflow', 'action', 'js')):
+            return self.scan_file(file_path, root, deep_scan=deep_scan)
+
+        result = ScanResult(name)
+        if deep_scan and kind == 'js_name':
+            self._check_known_malicious_file(name, result)
+        return result
+
+    def scan_bytes(self, name: str, data: bytes, deep_scan: bool = True) -> ScanResult:
+        """Сканирование содержимого файла, тип определяется по имени
+
+        Неподдерживаемый тип файла - ValueError. Если файл пропущен из-за
+        deep_scan=False, это отмечается в result.errors.
+        """
+        if classify_file(name) is None:
+            raise ValueError(f"Неподдерживаемый тип файла: {name}")
+
+        result = ScanResult(name)
+        if not self._scan_content(name, data.decode('utf-8', errors='ignore'), result, deep_scan):
+            result.errors.append(f"{name} не проверен: глубокое сканирование отключено (deep_scan=False)")
+        return result
+
+    def scan_lockfile(self, kind: str, stream) -> ScanResult:
+        """Сканирование lock файла из потока, kind - 'npm', 'yarn', 'pnpm' или имя файла"""
+        lock_name = kind if kind in LOCK_FILE_PARSERS else next(
+            (name for name, (lock_kind, _) in LOCK_FILE_PARSERS.items() if lock_kind == kind), None)
+        if lock_name is None:
+            raise ValueError(f"Неизвестный тип lock файла: {kind}")
+
+        content = stream.read()
+        if isinstance(content, bytes):
+            content = content.decode('utf-8', errors='ignore')
+
+        result = ScanResult(lock_name)
+        self._scan_lockfile_content(lock_name, content, result)
+        return result
+
+    def _scan_content(self, name: str, content: str, result: ScanResult, deep_scan: bool,
+                      check_name: bool = True) -> bool:
+        """Диспетчеризация содержимого по типу файла"""
+        kind = classify_file(name)
+        file_name = PurePosixPath(name).name
+
+        if kind == 'package_json':
+            self._scan_package_json_content(name, content, result)
+        elif kind == 'lockfile':
+            self._scan_lockfile_content(file_name, content, result)
+        elif not deep_scan or kind is None:
+            return False
+        elif kind in ('workflow', 'action'):
+            self._scan_workflow_content(name, content, result)
+        elif kind == 'js':
+            if check_name:
+                self._check_known_malicious_file(name, result)
+            self._scan_js_content(name, content, result)
+
+        result.scanned_files.append(name)
+        return True
+
+    def _collect_tree(self, project_dir: Path, result: ScanResult, workflow_files: List[Path],
+                      js_files: List[Path], deadline: Optional[float] = None,
+                      fail_fast: bool = False) -> Optional[str]:
+        """Один обход дерева: известные вредоносные файлы проверяются сразу по имени,
+        workflows (включая вложенные), composite actions и JS/TS собираются в списки.
+        Возвращает причину остановки ('time_budget', 'fail_fast') или None."""
+        for root, dirs, files in os.walk(project_dir):
+            if deadline is not None and time.monotonic() >= deadline:
+                return 'time_budget'
+            dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+            rel_root = Path(root).relative_to(project_dir)
+
+            for file_name in files:
+                name = (rel_root / file_name).as_posix()
+                kind = classify_tree_file(name)
+
+                if kind in ('js', 'js_name'):
+                    if self._check_known_malicious_file(name, result) and fail_fast:
+                        return 'fail_fast'
+                    if kind == 'js':
+                        js_files.append(Path(root) / file_name)
+                elif kind in ('workflow', 'action'):
+                    workflow_files.append(Path(root) / file_name)
+        return None
+
+    def _check_known_malicious_file(self, name: str, result: ScanResult) -> bool:
+        """Проверка имени файла по списку известных вредоносных файлов (True - найден)"""
+        file_name = PurePosixPath(name).name
+        if file_name not in KNOWN_MALICIOUS_FILES:
+            return False
+        result.findings.append({
+            'severity': 'CRITICAL',
+            'type': 'known_malicious_file',
+            'file': name,
+            'message': f'Обнаружен известный вредоносный файл: {file_name}'
+        })
+        return True
+
+    def _scan_js_content(self, name: str, content: str, result: ScanResult):
+        """Сканирование одного JS/TS файла"""
+        # Проверка на индикаторы в содержимом
+        for indicator in MALICIOUS_INDICATORS:
+            if indicator in content:
+                result.findings.append({
                     'severity': 'CRITICAL',
-                    'type': 'malicious_workflow_file',
-                    'file': str(file_path.relative_to(self.project_path)),
-                    'message': 'Обнаружен подозрительный workflow: discussion.yaml'
+                    'type': 'malicious_indicator_in_file',
+                    'file': name,
+                    'indicator': indicator,
+                    'message': f'Индикатор Shai-Hulud в файле: {indicator}'
                 })
-            
-            # Проверка на formatter workflow
-            if re.match(r'formatter_\d+\.ya?ml', file_path.name):
-                self.findings.append({
+
+        # Проверка на вредоносные паттерны
+        for pattern_name, severity, rule in self.js_rules:
+            line_num = 1
+            line_pos = 0
+            for match in rule.finditer(content):
+                # Номер строки считаем инкрементально от предыдущего совпадения
+                line_num += content.count('\n', line_pos, match.start())
+                line_pos = match.start()
+
+                result.findings.append({
+                    'severity': severity,
+                    'type': f'js_pattern_{pattern_name}',
+                    'file': name,
+                    'line': line_num,
+                    'pattern': pattern_name,
+                    'message': f'Обнаружен паттерн {pattern_name} (строка {line_num})'
+                })
+
+    def _scan_workflow_content(self, name: str, content: str, result: ScanResult):
+        """Сканирование workflow файла или composite action"""
+        file_name = PurePosixPath(name).name
+
+        # Проверка имени файла
+        if file_name == 'discussion.yaml' or file_name == 'discussion.yml':
+            result.findings.append({
+                'severity': 'CRITICAL',
+                'type': 'malicious_workflow_file',
+                'file': name,
+                'message': 'Обнаружен подозрительный workflow: discussion.yaml'
+            })
+
+        # Проверка на formatter workflow
+        if self.FORMATTER_WORKFLOW_NAME.match(file_name):
+            result.findings.append({
+                'severity': 'CRITICAL',
+                'type': 'malicious_workflow_file',
+                'file': name,
+                'message': f'Обнаружен подозрительный workflow: {file_name}'
+            })
+
+        # Проверка индикаторов
+        for indicator in MALICIOUS_INDICATORS:
+            if indicator in content:
+                result.findings.append({
                     'severity': 'CRITICAL',
-                    'type': 'malicious_workflow_file',
-                    'file': str(file_path.relative_to(self.project_path)),
-                    'message': f'Обнаружен подозрительный workflow: {file_path.name}'
+                    'type': 'malicious_indicator_in_workflow',
+                    'file': name,
+                    'indicator': indicator,
+                    'message': f'Индикатор Shai-Hulud в workflow: {indicator}'
                 })
-            
-            # Проверка индикаторов
-            for indicator in MALICIOUS_INDICATORS:
-                if indicator in content:
-                    self.findings.append({
-                        'severity': 'CRITICAL',
-                        'type': 'malicious_indicator_in_workflow',
-                        'file': str(file_path.relative_to(self.project_path)),
-                        'indicator': indicator,
-                        'message': f'Индикатор Shai-Hulud в workflow: {indicator}'
-                    })
-            
-            # Проверка на вредоносные паттерны
-            for pattern_name, pattern_regex in WORKFLOW_MALICIOUS_PATTERNS.items():
-                if re.search(pattern_regex, content, re.MULTILINE | re.DOTALL):
-                    self.findings.append({
-                        'severity': 'CRITICAL',
-                        'type': f'workflow_pattern_{pattern_name}',
-                        'file': str(file_path.relative_to(self.project_path)),
-                        'pattern': pattern_name,
-                        'message': f'Обнаружен паттерн {pattern_name} в workflow'
-                    })
-        
-        except Exception as e:
-            pass
 
-    def _scan_malicious_files(self, project_dir: Path):
-        """Поиск известных вредоносных файлов"""
-        malicious_files = ['setup_bun.js', 'bun_environment.js']
-        
-        for mal_file in malicious_files:
-            # Поиск файлов рекурсивно
-            for found_file in project_dir.rglob(mal_file):
-                # Пропускаем node_modules
-                if 'node_modules' not in found_file.parts:
-                    self.findings.append({
-                        'severity': 'CRITICAL',
-                        'type': 'known_malicious_file',
-                        'file': str(found_file.relative_to(self.project_path)),
-                        'message': f'Обнаружен известный вредоносный файл: {mal_file}'
-                    })
-                    self.scanned_files += 1
+        # Проверка правил по структуре каждого YAML документа
+        matched = set()
+        for document in WorkflowParser.parse(content):
+            for pattern_name, fields, trigger, rule in self.workflow_rules:
+                if pattern_name in matched:
+                    continue
+                if trigger and trigger not in document['triggers']:
+                    continue
+                values = (item for field in fields for item in document[field])
+                for line_num, value in values:
+                    if rule.search(value):
+                        matched.add(pattern_name)
+                        result.findings.append({
+                            'severity': 'CRITICAL',
+                            'type': f'workflow_pattern_{pattern_name}',
+                            'file': name,
+                            'line': line_num,
+                            'pattern': pattern_name,
+                            'message': f'Обнаружен паттерн {pattern_name} в workflow (строка {line_num})'
+                        })
+                        break
 
-    def _scan_package_json(self, package_json_path: Path):
+    def _scan_package_json_content(self, name: str, content: str, result: ScanResult):
         """Сканирование package.json"""
         try:
-            with open(package_json_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            data = json.loads(content)
+        except Exception as e:
+            result.errors.append(f"Ошибка чтения {name}: {e}")
+            return
+
+        self._check_compromised_packages(data, result)
+        self._check_malicious_scripts(data, result)
+        self._check_file_references(data, result)
+        self._check_repository_info(data, result)
 
-            self._check_compromised_packages(data, 'package.json')
-            self._check_malicious_scripts(data)
-            self._check_file_references(data)
-            self._check_repository_info(data)
+    def _scan_lockfile_content(self, lock_name: str, content: str, result: ScanResult):
+        """Разбор и проверка lock файла"""
+        _, parser = LOCK_FILE_PARSERS[lock_name]
+        try:
+            packages = parser(content)
         except Exception as e:
-            print(f"❌ Ошибка чтения package.json: {e}")
+            result.errors.append(f"Ошибка парсинга {lock_name}: {e}")
+            return
+        self._check_lock_packages(packages, lock_name, result)
 
-    def _check_lock_packages(self, packages: Dict[str, str], source: str):
+    def _check_lock_packages(self, packages: Dict[str, str], source: str, result: ScanResult):
         """Проверка пакетов из lock файла"""
         for pkg_name, version in packages.items():
-            self.all_packages[pkg_name] = version
+            result.packages[pkg_name] = version
 
             if pkg_name in self.compromised_packages:
-                clean_version = re.sub(r'^[^0-9]*', '', version)
+                clean_version = self.VERSION_PREFIX.sub('', version)
 
                 if clean_version in self.compromised_packages[pkg_name]:
-                    self.findings.append({
+                    result.findings.append({
                         'severity': 'CRITICAL',
                         'type': 'compromised_package_lock',
                         'source': source,
@@ -471,7 +1089,7 @@ class ShaiHuludDetectorFinal:
                         'message': f'[{source}] Скомпрометированный: {pkg_name}@{version}'
                     })
 
-    def _check_compromised_packages(self, package_json: Dict, source: str):
+    def _check_compromised_packages(self, package_json: Dict, result: ScanResult):
         """Проверка зависимостей из package.json"""
         sections = ['dependencies', 'devDependencies', 'optionalDependencies']
 
@@ -481,10 +1099,10 @@ class ShaiHuludDetectorFinal:
 
             for package, version in package_json[section].items():
                 if package in self.compromised_packages:
-                    clean_version = re.sub(r'^[^0-9]*', '', version)
+                    clean_version = self.VERSION_PREFIX.sub('', version)
 
                     if clean_version in self.compromised_packages[package]:
-                        self.findings.append({
+                        result.findings.append({
                             'severity': 'CRITICAL',
                             'type': 'compromised_package',
                             'section': section,
@@ -493,7 +1111,7 @@ class ShaiHuludDetectorFinal:
                             'message': f'[package.json] Скомпрометированный: {package}@{version}'
                         })
 
-    def _check_malicious_scripts(self, package_json: Dict):
+    def _check_malicious_scripts(self, package_json: Dict, result: ScanResult):
         """Проверка scripts секции"""
         if 'scripts' not in package_json:
             return
@@ -503,7 +1121,7 @@ class ShaiHuludDetectorFinal:
         for script_name, script_content in scripts.items():
             for indicator in MALICIOUS_INDICATORS:
                 if indicator in script_content:
-                    self.findings.append({
+                    result.findings.append({
                         'severity': 'CRITICAL',
                         'type': 'malicious_indicator',
                         'script': script_name,
@@ -511,9 +1129,9 @@ class ShaiHuludDetectorFinal:
                         'message': f'Индикатор Shai-Hulud: {indicator}'
                     })
 
-            for pattern in SUSPICIOUS_SCRIPT_PATTERNS:
-                if re.search(pattern, script_content):
-                    self.findings.append({
+            for rule in self.script_rules:
+                if rule.search(script_content):
+                    result.findings.append({
                         'severity': 'WARNING',
                         'type': 'suspicious_script',
                         'script': script_name,
@@ -522,14 +1140,14 @@ class ShaiHuludDetectorFinal:
 
             if script_name in ['preinstall', 'postinstall', 'install']:
                 if any(word in script_content.lower() for word in ['curl', 'wget', 'bun', 'github']):
-                    self.findings.append({
+                    result.findings.append({
                         'severity': 'HIGH',
                         'type': 'suspicious_lifecycle_script',
                         'script': script_name,
                         'message': f'Подозрительный {script_name}'
                     })
 
-    def _check_file_references(self, package_json: Dict):
+    def _check_file_references(self, package_json: Dict, result: ScanResult):
         """Проверка файловых ссылок"""
         for field in ['main', 'bin', 'browser']:
             if field in package_json:
@@ -537,29 +1155,114 @@ class ShaiHuludDetectorFinal:
                 if isinstance(value, str):
                     for indicator in MALICIOUS_INDICATORS:
                         if indicator in value:
-                            self.findings.append({
+                            result.findings.append({
                                 'severity': 'CRITICAL',
                                 'type': 'malicious_file_reference',
                                 'field': field,
                                 'message': f'Подозрительный файл в "{field}": {value}'
                             })
 
-    def _check_repository_info(self, package_json: Dict):
+    def _check_repository_info(self, package_json: Dict, result: ScanResult):
         """Проверка репозитория"""
         if 'repository' in package_json:
             repo = package_json['repository']
             repo_url = repo if isinstance(repo, str) else repo.get('url', '')
 
             if any(indicator in repo_url for indicator in ['Sha1-Hulud', 'SHA1HULUD']):
-                self.findings.append({
+                result.findings.append({
                     'severity': 'CRITICAL',
                     'type': 'malicious_repository',
                     'message': 'Репозиторий Shai-Hulud!'
                 })
 
+
+class ShaiHuludDetectorFinal:
+    """Консольный интерфейс поверх ScannerEngine: запуск сканирования и вывод результатов"""
+
+    def __init__(self, project_path: str, update_iocs: bool = False, deep_scan: bool = True,
+                 engine: Optional[ScannerEngine] = None, fail_fast: bool = False,
+                 time_budget: Optional[float] = None, deadline: Optional[float] = None):
+        self.project_path = Path(project_path)
+        self.engine = engine or ScannerEngine(update_iocs=update_iocs, verbose=True)
+        self.compromised_packages = self.engine.compromised_packages
+        self.deep_scan = deep_scan
+        self.fail_fast = fail_fast
+        # time_budget - лимит пользователя (--time-budget); deadline (time.monotonic)
+        # задаётся при рекурсивном сканировании, где лимит общий на все проекты
+        self.time_budget = time_budget
+        self.deadline = deadline
+        self.result = ScanResult(str(self.project_path))
+        self.start_time = time.monotonic()
+
+    @property
+    def findings(self) -> List[Dict]:
+        return self.result.findings
+
+    @property
+    def all_packages(self) -> Dict[str, str]:
+        return self.result.packages
+
+    @property
+    def scanned_files(self) -> int:
+        return len(self.result.scanned_files)
+
+    @property
+    def partial(self) -> bool:
+        return self.result.partial
+
+    def _project_dir(self) -> Path:
+        return self.project_path.parent if self.project_path.is_file() else self.project_path
+
+    def scan(self) -> bool:
+        """Выполнить полное сканирование проекта"""
+        print(f"\n🔍 Сканирование проекта: {self.project_path}")
+        print("=" * 70)
+
+        project_dir = self._project_dir()
+        time_budget = self.time_budget
+        if self.deadline is not None:
+            time_budget = max(0.0, self.deadline - time.monotonic())
+        self.result = self.engine.scan_path(project_dir, deep_scan=self.deep_scan,
+                                            fail_fast=self.fail_fast, time_budget=time_budget)
+        self._print_progress(project_dir)
+
+        return self._print_results()
+
+    def _print_progress(self, project_dir: Path):
+        """Вывод найденных файлов зависимостей и статистики глубокого сканирования"""
+        print(f"\n📦 Поиск файлов зависимостей...")
+
+        kinds: Dict[str, int] = {}
+        for name in self.result.scanned_files:
+            kind = classify_file(name)
+            kinds[kind] = kinds.get(kind, 0) + 1
+            if kind in ('package_json', 'lockfile'):
+                print(f"  ✓ {name}")
+
+        if (project_dir / 'bun.lockb').exists():
+            print(f"  ⚠️  bun.lockb (бинарный формат - не поддерживается)")
+
+        for error in self.result.errors:
+            print(f"⚠️  {error}")
+
+        if not kinds.get('package_json') and not kinds.get('lockfile'):
+            print(f"\n⚠️  Не найдено файлов зависимостей в {project_dir}")
+
+        if self.all_packages:
+            print(f"\n📊 Проверено пакетов: {len(self.all_packages)}")
+        print(f"📊 База IOCs: {len(self.compromised_packages)} скомпрометированных пакетов")
+
+        if self.deep_scan:
+            print(f"\n🔬 Глубокое сканирование исходного кода...")
+            if kinds.get('js'):
+                print(f"  📄 Проверено {kinds['js']} JS/TS файлов")
+            if kinds.get('workflow') or kinds.get('action'):
+                print(f"  🔧 Проверено {kinds.get('workflow', 0)} workflow файлов "
+                      f"и {kinds.get('action', 0)} composite actions")
+
     def _print_results(self) -> bool:
         """Вывод результатов"""
-        elapsed_time = (datetime.now() - self.start_time).total_seconds()
+        elapsed_time = time.monotonic() - self.start_time
         
         print(f"\n{'=' * 70}")
         print(f"📊 Сканирование завершено")
@@ -567,10 +1270,18 @@ class ShaiHuludDetectorFinal:
         print(f"⏱️  Время: {elapsed_time:.2f}s")
         print(f"📄 Проверено файлов: {self.scanned_files}")
         print(f"📦 Проверено пакетов: {len(self.all_packages)}")
+
+        if self.partial:
+            reason = ('первая CRITICAL находка (--fail-fast)' if self.result.stop_reason == 'fail_fast'
+                      else f'исчерпан лимит времени {self.time_budget}s (--time-budget)')
+            print(f"\n⚠️  ЧАСТИЧНЫЙ РЕЗУЛЬТАТ: сканирование остановлено досрочно - {reason}")
         
         if not self.findings:
             print("\n✅ Индикаторов Shai-Hulud 2.0 не обнаружено")
-            print("✅ Проект безопасен")
+            if self.partial:
+                print("⚠️  Проверена только часть проекта - безопасность не подтверждена")
+            else:
+                print("✅ Проект безопасен")
             return True
 
         critical = [f for f in self.findings if f['severity'] == 'CRITICAL']
@@ -596,14 +1307,7 @@ class ShaiHuludDetectorFinal:
         print(f"{'=' * 70}\n")
         
         for finding in critical + high + warnings:
-            emoji = "🔴" if finding['severity'] == 'CRITICAL' else "🟠" if finding['severity'] == 'HIGH' else "🟡"
-            print(f"{emoji} [{finding['severity']}] {finding['type']}")
-            print(f"   {finding['message']}")
-
-            for key, value in finding.items():
-                if key not in ['severity', 'type', 'message']:
-                    print(f"   • {key}: {value}")
-            print()
+            self._print_finding(finding)
 
         if len(critical) > 0:
             print(f"{'=' * 70}")
@@ -628,16 +1332,106 @@ class ShaiHuludDetectorFinal:
 
         return len(critical) == 0
 
+    @staticmethod
+    def _print_finding(finding: Dict):
+        """Вывод одной находки"""
+        emoji = "🔴" if finding['severity'] == 'CRITICAL' else "🟠" if finding['severity'] == 'HIGH' else "🟡"
+        print(f"{emoji} [{finding['severity']}] {finding['type']}")
+        print(f"   {finding['message']}")
+
+        for key, value in finding.items():
+            if key not in ['severity', 'type', 'message']:
+                print(f"   • {key}: {value}")
+        print()
+
+    def watch(self) -> bool:
+        """Непрерывное наблюдение за проектом с пересканированием изменённых файлов"""
+        project_dir = self._project_dir()
+        is_clean = self.scan()
+
+        # Находки, уже показанные пользователю, повторно не выводятся
+        seen = {self._finding_key(f) for f in self.findings}
+
+        watcher = create_watcher(project_dir)
+        print(f"\n👀 Режим наблюдения: {project_dir} ({type(watcher).__name__}), Ctrl+C для выхода")
+
+        def wait(timeout: Optional[float]) -> Optional[Set[Path]]:
+            # Ошибка inotify (например, ENOSPC) не должна завершать наблюдение
+            nonlocal watcher
+            try:
+                return watcher.wait(timeout)
+            except OSError as e:
+                if isinstance(watcher, PollingWatcher):
+                    raise
+                print(f"⚠️  Ошибка inotify ({e}), переключение на polling раз в {WATCH_POLL_INTERVAL:.0f}s")
+                watcher.close()
+                watcher = PollingWatcher(project_dir)
+                # События могли быть потеряны - один раз пересканируем все файлы
+                return set(watcher.snapshot)
+
+        try:
+            while True:
+                changed = wait(None)
+                if not changed:
+                    continue
+
+                # Debounce: собираем пачку событий (например, npm install) до паузы без событий
+                batch_start = time.monotonic()
+                while time.monotonic() - batch_start < WATCH_MAX_BATCH_SECONDS:
+                    more = wait(WATCH_DEBOUNCE_SECONDS)
+                    if more is None:
+                        break
+                    changed.update(more)
+
+                batch = ScanResult(str(project_dir))
+                for file_path in sorted(changed):
+                    if file_path.is_file():
+                        batch.merge(self.engine.scan_tree_file(file_path, project_dir,
+                                                               deep_scan=self.deep_scan))
+
+                self.result.packages.update(batch.packages)
+                self.result.scanned_files.extend(batch.scanned_files)
+                for error in batch.errors:
+                    print(f"⚠️  {error}")
+
+                for finding in batch.findings:
+                    key = self._finding_key(finding)
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    self.findings.append(finding)
+                    if finding['severity'] == 'CRITICAL':
+                        is_clean = False
+                    print(f"[{time.strftime('%H:%M:%S')}] Новая находка:")
+                    self._print_finding(finding)
+
+                if batch.scanned_files:
+                    print(f"[{time.strftime('%H:%M:%S')}] 🔄 Пересканировано файлов: {len(batch.scanned_files)}")
+        except KeyboardInterrupt:
+            print("\n⏹️  Наблюдение остановлено")
+        finally:
+            watcher.close()
+
+        return is_clean
+
+    @staticmethod
+    def _finding_key(finding: Dict) -> Tuple:
+        return tuple(sorted((key, str(value)) for key, value in finding.items()))
+
     def generate_json_report(self, output_file: str = "shai-hulud-scan-report.json") -> None:
         """Генерация JSON отчёта"""
+        from datetime import datetime
+
         report = {
             'scan_info': {
                 'target': str(self.project_path),
                 'timestamp': datetime.now().isoformat(),
-                'elapsed_seconds': (datetime.now() - self.start_time).total_seconds(),
+                'elapsed_seconds': time.monotonic() - self.start_time,
                 'scanned_files': self.scanned_files,
                 'scanned_packages': len(self.all_packages),
                 'iocs_database_size': len(self.compromised_packages),
+                'partial': self.partial,
+                'stop_reason': self.result.stop_reason,
             },
             'summary': {
                 'total_findings': len(self.findings),
@@ -656,8 +1450,19 @@ class ShaiHuludDetectorFinal:
         print(f"\n📄 JSON отчёт сохранён: {output_path.absolute()}")
 
 
-def scan_directory(directory: str, update_iocs: bool = False, deep_scan: bool = True) -> bool:
+def scan_directory(directory: str, update_iocs: bool = False, deep_scan: bool = True,
+                   fail_fast: bool = False, time_budget: Optional[float] = None,
+                   engine: Optional[ScannerEngine] = None) -> bool:
     """Рекурсивное сканирование директории"""
+    is_clean, _ = scan_projects(directory, update_iocs=update_iocs, deep_scan=deep_scan,
+                                fail_fast=fail_fast, time_budget=time_budget, engine=engine)
+    return is_clean
+
+
+def scan_projects(directory: str, update_iocs: bool = False, deep_scan: bool = True,
+                  fail_fast: bool = False, time_budget: Optional[float] = None,
+                  engine: Optional[ScannerEngine] = None) -> Tuple[bool, bool]:
+    """Рекурсивное сканирование директории, возвращает (нет CRITICAL, результат частичный)"""
     directory_path = Path(directory)
 
     if not directory_path.exists():
@@ -673,40 +1478,71 @@ def scan_directory(directory: str, update_iocs: bool = False, deep_scan: bool =
 
     if not projects:
         print(f"⚠️  Проекты с package.json не найдены в {directory}")
-        return True
+        return True, False
 
     print(f"\n📦 Найдено {len(projects)} проектов для сканирования")
     print(f"🔬 Режим: {'Глубокое сканирование' if deep_scan else 'Только зависимости'}\n")
 
+    # IOC база и правила загружаются один раз для всех проектов
+    engine = engine or ScannerEngine(update_iocs=update_iocs, verbose=True)
+
     all_clean = True
     total_findings = 0
+    clean_projects = 0
+    problem_projects = 0
+    partial_projects = 0
+    skipped_projects = 0
+    deadline = time.monotonic() + time_budget if time_budget is not None else None
     
     for i, project_dir in enumerate(sorted(projects), 1):
+        # Общий лимит времени и fail-fast действуют на все проекты сразу
+        remaining = deadline - time.monotonic() if deadline is not None else None
+        if (fail_fast and not all_clean) or (remaining is not None and remaining <= 0):
+            skipped_projects = len(projects) - i + 1
+            print(f"\n⚠️  ЧАСТИЧНЫЙ РЕЗУЛЬТАТ: не проверено проектов: {skipped_projects}")
+            break
+
         print(f"\n{'=' * 70}")
         print(f"Проект {i}/{len(projects)}: {project_dir.name}")
         print(f"{'=' * 70}")
         
-        detector = ShaiHuludDetectorFinal(str(project_dir), update_iocs=update_iocs, deep_scan=deep_scan)
+        detector = ShaiHuludDetectorFinal(str(project_dir), deep_scan=deep_scan, engine=engine,
+                                          fail_fast=fail_fast, time_budget=time_budget, deadline=deadline)
         is_clean = detector.scan()
 
         if not is_clean:
             all_clean = False
+            problem_projects += 1
             total_findings += len(detector.findings)
+        elif detector.partial:
+            partial_projects += 1
+        else:
+            clean_projects += 1
+
+    partial = bool(partial_projects or skipped_projects)
 
     print(f"\n{'=' * 70}")
-    print(f"📊 Итоговая статистика")
+    print(f"📊 Итоговая статистика{' (ЧАСТИЧНЫЙ РЕЗУЛЬТАТ)' if partial else ''}")
     print(f"{'=' * 70}")
     print(f"Всего проектов: {len(projects)}")
-    print(f"Чистых проектов: {sum(1 for _ in projects) - (0 if all_clean else 1)}")
-    print(f"Проблемных проектов: {0 if all_clean else 1}")
+    print(f"Проверено проектов: {len(projects) - skipped_projects}")
+    print(f"Чистых проектов: {clean_projects}")
+    print(f"Проблемных проектов: {problem_projects}")
+    if partial_projects:
+        print(f"Проверено частично (без CRITICAL): {partial_projects}")
+    if skipped_projects:
+        print(f"Не проверено проектов: {skipped_projects}")
     print(f"Всего находок: {total_findings}")
     
-    if all_clean:
+    if all_clean and partial:
+        print("\n⚠️  CRITICAL не обнаружено, но проверка неполная")
+        return True, True
+    elif all_clean:
         print("\n✅ Все проекты безопасны!")
-        return True
+        return True, False
     else:
         print("\n🚨 Обнаружены потенциальные угрозы!")
-        return False
+        return False, partial
 
 
 def main():
@@ -723,12 +1559,20 @@ def main():
   %(prog)s . --update-iocs                 # Обновить базу IOCs
   %(prog)s . --quick                       # Быстрое сканирование (только зависимости)
   %(prog)s . --json-report report.json     # Сохранить JSON отчёт
+  %(prog)s . --watch                       # Наблюдение за проектом (self-hosted runners)
+  %(prog)s . --fail-fast                   # Остановиться на первой CRITICAL находке
+  %(prog)s . --time-budget 5               # Не дольше 5 секунд (частичный результат)
 
 Уровни severity:
   🔴 CRITICAL - Прямые индикаторы атаки, требует немедленных действий
   🟠 HIGH     - Подозрительное поведение, требует проверки
   🟡 WARNING  - Потенциально опасные паттерны
 
+Коды возврата:
+  0 - CRITICAL не обнаружено
+  1 - обнаружены CRITICAL находки
+  2 - CRITICAL не обнаружено, но результат частичный (--fail-fast/--time-budget)
+
 Подробнее: https://github.com/DataDog/indicators-of-compromise/tree/main/shai-hulud-2.0
         """
     )
@@ -742,9 +1586,19 @@ def main():
                        help='Рекурсивное сканирование всех проектов в директории')
     parser.add_argument('--json-report', metavar='FILE',
                        help='Сохранить результаты в JSON файл')
+    parser.add_argument('--watch', action='store_true',
+                       help='Непрерывное наблюдение: пересканировать изменённые файлы (inotify/polling)')
+    parser.add_argument('--fail-fast', action='store_true',
+                       help='Остановить сканирование на первой CRITICAL находке')
+    parser.add_argument('--time-budget', type=float, metavar='SECONDS',
+                       help='Лимит времени сканирования; по истечении возвращается частичный результат')
+    parser.add_argument('--ioc-cache', action='store_true',
+                       help='Кэшировать разобранный CSV с IOCs (marshal) рядом со сканером')
     parser.add_argument('--version', action='version', version='%(prog)s 1.0.0 (Final)')
     
     args = parser.parse_args()
+    if args.watch and (args.fail_fast or args.time_budget is not None):
+        parser.error("--watch нельзя сочетать с --fail-fast и --time-budget")
 
     target_path = Path(args.path)
     deep_scan = not args.quick
@@ -753,21 +1607,37 @@ def main():
         print(f"❌ Невалидный путь: {args.path}")
         sys.exit(1)
 
+    # IOC база и правила загружаются один раз на запуск
+    engine = ScannerEngine(update_iocs=args.update_iocs, verbose=True, use_snapshot=args.ioc_cache)
+
+    # Непрерывное наблюдение (всё дерево проекта, --recursive не нужен)
+    if args.watch:
+        detector = ShaiHuludDetectorFinal(args.path, deep_scan=deep_scan, engine=engine)
+        is_clean = detector.watch()
+
+        if args.json_report:
+            detector.generate_json_report(args.json_report)
+
+        sys.exit(0 if is_clean else 1)
+
     # Рекурсивное сканирование директории
     if args.recursive and target_path.is_dir():
-        is_clean = scan_directory(args.path, update_iocs=args.update_iocs, deep_scan=deep_scan)
-        sys.exit(0 if is_clean else 1)
+        is_clean, partial = scan_projects(args.path, update_iocs=args.update_iocs, deep_scan=deep_scan,
+                                          fail_fast=args.fail_fast, time_budget=args.time_budget,
+                                          engine=engine)
+        sys.exit(1 if not is_clean else 2 if partial else 0)
     
     # Сканирование одного проекта
     if target_path.is_file() or target_path.is_dir():
-        detector = ShaiHuludDetectorFinal(args.path, update_iocs=args.update_iocs, deep_scan=deep_scan)
+        detector = ShaiHuludDetectorFinal(args.path, deep_scan=deep_scan, engine=engine,
+                                          fail_fast=args.fail_fast, time_budget=args.time_budget)
         is_clean = detector.scan()
         
         # Сохранение JSON отчёта
         if args.json_report:
             detector.generate_json_report(args.json_report)
         
-        sys.exit(0 if is_clean else 1)
+        sys.exit(1 if not is_clean else 2 if detector.partial else 0)
 
 
 if __name__ == "__main__":